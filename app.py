@@ -4,55 +4,398 @@ Reddit Tracker Web Interface
 Flask app to display tracked Reddit accounts with cards and analytics.
 """
 
+import gzip
+import mimetypes
 import os
 import sqlite3
-from datetime import datetime, timedelta
+import zlib
+from datetime import datetime, timedelta, timezone
+from itertools import pairwise
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_from_directory
+import orjson
+from flask import (Flask, g, render_template, jsonify, make_response, request,
+                   send_from_directory, stream_with_context)
+from flask.json.provider import JSONProvider
+from werkzeug.security import safe_join
 
 BASE_DIR = Path(__file__).parent
 DB_PATH = Path(os.environ.get("DATABASE_PATH", BASE_DIR / "reddit_data.db"))
 STATIC_DIR = BASE_DIR / "static"
+POSTS_PAGE_SIZE = 50
+# Rows fetched per step when streaming JSON series
+STREAM_BATCH_SIZE = 1000
+# Images are written once per post and never change, so browsers may keep them
+IMAGE_MAX_AGE = 31536000
+# Internal nginx location aliased to static/images, e.g. "/_images"
+X_ACCEL_REDIRECT_PREFIX = os.environ.get("X_ACCEL_REDIRECT_PREFIX")
+# JSON bodies smaller than this aren't worth gzipping
+GZIP_MIN_SIZE = 500
+
+# Rendered dashboard, keyed by a version token that changes on every ingest
+_dashboard_cache = {}
+
+# Queries are built once at import; sqlite3 keys its per-connection
+# prepared-statement cache on this text, so repeat requests skip re-parsing
+_DASHBOARD_VERSION_SQL = """
+    SELECT
+        (SELECT MAX(id) FROM account_snapshots),
+        (SELECT MAX(id) FROM posts),
+        (SELECT MAX(id) FROM comments)
+"""
+
+_POSTS_PAGE_BEFORE_SQL = """
+    SELECT post_id, subreddit, title, score, num_comments, created_utc,
+           permalink, local_image_path, over_18
+    FROM posts 
+    WHERE username = ? AND (created_utc, post_id) < (?, ?)
+    ORDER BY created_utc DESC, post_id DESC
+    LIMIT ?
+"""
+
+_POSTS_PAGE_SQL = """
+    SELECT post_id, subreddit, title, score, num_comments, created_utc,
+           permalink, local_image_path, over_18
+    FROM posts 
+    WHERE username = ?
+    ORDER BY created_utc DESC, post_id DESC
+    LIMIT ?
+"""
+
+_DASHBOARD_SQL = """
+    SELECT username, last_updated, total_karma, post_karma, comment_karma,
+           post_count, comment_count
+    FROM user_summary
+    WHERE last_updated IS NOT NULL
+    ORDER BY total_karma DESC
+"""
+
+# Same rows computed from the base tables, for databases created before
+# user_summary existed and not re-initialized since
+_DASHBOARD_AGGREGATE_SQL = """
+    WITH latest AS (
+        SELECT username, timestamp, post_karma, comment_karma, total_karma,
+               ROW_NUMBER() OVER (PARTITION BY username ORDER BY timestamp DESC) as rn
+        FROM account_snapshots
+    ),
+    post_counts AS (
+        SELECT username, COUNT(*) as count FROM posts GROUP BY username
+    ),
+    comment_counts AS (
+        SELECT username, COUNT(*) as count FROM comments GROUP BY username
+    )
+    SELECT 
+        l.username,
+        l.timestamp as last_updated,
+        l.total_karma,
+        l.post_karma,
+        l.comment_karma,
+        COALESCE(pc.count, 0) as post_count,
+        COALESCE(cc.count, 0) as comment_count
+    FROM latest l
+    LEFT JOIN post_counts pc ON pc.username = l.username
+    LEFT JOIN comment_counts cc ON cc.username = l.username
+    WHERE l.rn = 1
+    ORDER BY l.total_karma DESC
+"""
+
+_LATEST_SNAPSHOT_SQL = """
+    SELECT username, timestamp, post_karma, comment_karma, total_karma
+    FROM account_snapshots 
+    WHERE username = ? 
+    ORDER BY timestamp DESC LIMIT 1
+"""
+
+_POST_COUNT_SQL = "SELECT COUNT(*) as count FROM posts WHERE username = ?"
+
+_SNAPSHOT_COUNT_SQL = "SELECT COUNT(*) as count FROM account_snapshots WHERE username = ?"
+
+_KARMA_HISTORY_RANGE_SQL = """
+    SELECT timestamp, post_karma, comment_karma, total_karma
+    FROM account_snapshots 
+    WHERE username = ? AND timestamp BETWEEN datetime(?) AND datetime(?)
+    ORDER BY timestamp ASC
+"""
+
+_KARMA_HISTORY_SQL = """
+    SELECT timestamp, post_karma, comment_karma, total_karma
+    FROM account_snapshots 
+    WHERE username = ? AND timestamp >= ?
+    ORDER BY timestamp ASC
+"""
+
+_POSTS_HISTORY_SQL = """
+    SELECT DATE(created_utc) as date, COUNT(*) as count
+    FROM posts 
+    WHERE username = ?
+    GROUP BY DATE(created_utc)
+    ORDER BY date ASC
+"""
+
+_SUBREDDIT_BREAKDOWN_SQL = """
+    SELECT subreddit, COUNT(*) as count, COALESCE(SUM(score), 0) as total_score
+    FROM posts 
+    WHERE username = ?
+    GROUP BY subreddit
+    ORDER BY count DESC
+    LIMIT 10
+"""
+
+_SCORE_HISTORY_SQL = """
+    SELECT timestamp, score
+    FROM score_history 
+    WHERE item_type = ? AND item_id = ?
+    ORDER BY timestamp ASC
+"""
+
+# created_utc is stored as ISO text, so the hour is sliced out directly
+# rather than re-parsed by a second strftime() per row
+_ACTIVITY_SQL = """
+    SELECT 
+        'post' as kind,
+        CAST(strftime('%w', created_utc) AS INTEGER) as day_of_week,
+        CAST(substr(created_utc, 12, 2) AS INTEGER) as hour,
+        COUNT(*) as count
+    FROM posts 
+    WHERE username = ?
+    GROUP BY day_of_week, hour
+    UNION ALL
+    SELECT 
+        'comment' as kind,
+        CAST(strftime('%w', created_utc) AS INTEGER) as day_of_week,
+        CAST(substr(created_utc, 12, 2) AS INTEGER) as hour,
+        COUNT(*) as count
+    FROM comments 
+    WHERE username = ?
+    GROUP BY day_of_week, hour
+"""
+
+_KARMA_CHANGES_SQL = """
+    SELECT timestamp, total_karma
+    FROM account_snapshots 
+    WHERE username = ? AND timestamp >= ?
+    ORDER BY timestamp ASC
+"""
+
+# Chart endpoints returning {"column": [...], ...}: name -> (sql, column names).
+# The first column is always the x-axis labels.
+COLUMN_QUERIES = {
+    'karma': (_KARMA_HISTORY_SQL, ('labels', 'post_karma', 'comment_karma', 'total_karma')),
+    'karma_range': (_KARMA_HISTORY_RANGE_SQL, ('labels', 'post_karma', 'comment_karma', 'total_karma')),
+    'posts': (_POSTS_HISTORY_SQL, ('labels', 'counts')),
+    'subreddits': (_SUBREDDIT_BREAKDOWN_SQL, ('labels', 'counts', 'scores')),
+    'score_history': (_SCORE_HISTORY_SQL, ('labels', 'scores')),
+    'karma_changes': (_KARMA_CHANGES_SQL, ('labels', 'total_karma')),
+}
+
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, so jsonify() skips the stdlib encoder."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 
 app = Flask(__name__, static_folder=str(STATIC_DIR), template_folder=str(BASE_DIR / "templates"))
+app.json = ORJSONProvider(app)
+# Let a front-end server (Apache/lighttpd) send image bytes via X-Sendfile
+app.use_x_sendfile = os.environ.get("X_SENDFILE", "false").lower() in ("1", "true")
 
 
 def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get the database connection for the current app context."""
+    conn = getattr(g, '_db', None)
+    if conn is None:
+        conn = g._db = sqlite3.connect(DB_PATH, cached_statements=256, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            PRAGMA temp_store=MEMORY;
+        """)
     return conn
 
 
+@app.teardown_appcontext
+def close_db(exc):
+    """Close the database connection at the end of the app context."""
+    conn = g.pop('_db', None)
+    if conn is not None:
+        conn.close()
+
+
+@app.after_request
+def gzip_json(response):
+    """Gzip JSON responses for clients that accept it (chart series compress well)."""
+    if (response.mimetype != 'application/json'
+            or response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or request.accept_encodings.quality('gzip') <= 0):
+        return response
+    
+    if response.is_streamed:
+        response.response = gzip_stream(response.response)
+    else:
+        body = response.get_data()
+        if len(body) < GZIP_MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(body, compresslevel=6))
+    
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def gzip_stream(chunks):
+    """Gzip a streamed response body chunk by chunk."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def get_tuple_cursor(conn):
+    """Get a cursor returning plain tuples instead of sqlite3.Row objects."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def dashboard_version(cursor):
+    """
+    Cheap token identifying the current dashboard data.
+    Every ingest or merge inserts rows with new AUTOINCREMENT ids (merged
+    snapshots can carry older timestamps), and each MAX(id) is a rowid seek.
+    """
+    cursor.execute(_DASHBOARD_VERSION_SQL)
+    return "-".join(str(value) for value in cursor.fetchone())
+
+
+def fetch_posts_page(cursor, username, before=None):
+    """
+    Fetch one page of a user's posts, newest first, with only the card columns.
+    Pages are keyed on (created_utc, post_id), so posts sharing a timestamp
+    are neither skipped nor repeated, and each page is an index range scan.
+    Returns (posts, next_before); next_before is the (created_utc, post_id)
+    key of the last card, or None on the last page.
+    """
+    if before:
+        cursor.execute(_POSTS_PAGE_BEFORE_SQL, (username, *before, POSTS_PAGE_SIZE + 1))
+    else:
+        cursor.execute(_POSTS_PAGE_SQL, (username, POSTS_PAGE_SIZE + 1))
+    posts = [dict(row) for row in cursor.fetchall()]
+    
+    if len(posts) > POSTS_PAGE_SIZE:
+        del posts[POSTS_PAGE_SIZE:]
+        return posts, (posts[-1]['created_utc'], posts[-1]['post_id'])
+    return posts, None
+
+
+def stream_columns(name, params):
+    """
+    Stream a COLUMN_QUERIES result as JSON with one column per query pass,
+    so memory stays flat however long the series is. The passes share one
+    read transaction and therefore see the same rows, provided the query's
+    parameters are literals (see hours_ago) rather than 'now' expressions,
+    which SQLite re-evaluates on every pass.
+    """
+    sql, names = COLUMN_QUERIES[name]
+    
+    def generate():
+        # The connection is fetched inside the generator: the view's app
+        # context (and its connection) is torn down before streaming starts
+        cursor = get_tuple_cursor(get_db())
+        cursor.execute("BEGIN")
+        try:
+            for index, column in enumerate(names):
+                yield (b'{"' if index == 0 else b'],"') + column.encode() + b'":['
+                cursor.execute(sql, params)
+                separator = b''
+                while rows := cursor.fetchmany(STREAM_BATCH_SIZE):
+                    yield separator + orjson.dumps([row[index] for row in rows])[1:-1]
+                    separator = b','
+            yield b']}'
+        finally:
+            cursor.execute("COMMIT")
+    
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+def columns(rows, count):
+    """
+    Transpose result rows into one tuple per column.
+    zip() does the transposition in C and orjson serializes tuples natively,
+    so no per-column list copies are made.
+    """
+    if not rows:
+        return ((),) * count
+    return tuple(zip(*rows))
+
+
+def query_columns(name, params):
+    """Run a COLUMN_QUERIES query and return its result as {"column": (...), ...}."""
+    sql, names = COLUMN_QUERIES[name]
+    cursor = get_tuple_cursor(get_db())
+    cursor.execute(sql, params)
+    return dict(zip(names, columns(cursor.fetchall(), len(names))))
+
+
+def hours_ago(hours):
+    """UTC cutoff in the "YYYY-MM-DD HH:MM:SS" form CURRENT_TIMESTAMP stores."""
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+    except OverflowError:
+        # Reaches back before year 1: every stored timestamp is newer
+        return '0000-01-01 00:00:00'
+    return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+
 @app.route('/')
 def index():
     """Main dashboard - list all tracked users."""
     conn = get_db()
     cursor = conn.cursor()
     
-
-    cursor.execute("""
-        SELECT 
-            username,
-            MAX(timestamp) as last_updated,
-            (SELECT total_karma FROM account_snapshots a2 
-             WHERE a2.username = a1.username 
-             ORDER BY timestamp DESC LIMIT 1) as total_karma,
-            (SELECT post_karma FROM account_snapshots a2 
-             WHERE a2.username = a1.username 
-             ORDER BY timestamp DESC LIMIT 1) as post_karma,
-            (SELECT comment_karma FROM account_snapshots a2 
-             WHERE a2.username = a1.username 
-             ORDER BY timestamp DESC LIMIT 1) as comment_karma,
-            (SELECT COUNT(*) FROM posts WHERE posts.username = a1.username) as post_count,
-            (SELECT COUNT(*) FROM comments WHERE comments.username = a1.username) as comment_count
-        FROM account_snapshots a1
-        GROUP BY username
-        ORDER BY total_karma DESC
-    """)
+    version = dashboard_version(cursor)
+    html = _dashboard_cache.get(version)
+    if html is None:
+        html = render_dashboard(cursor)
+        _dashboard_cache.clear()
+        _dashboard_cache[version] = html
+    
+    response = make_response(html)
+    response.set_etag(version)
+    return response.make_conditional(request)
+
+
+def render_dashboard(cursor):
+    """
+    Render the dashboard HTML from the trigger-maintained user_summary table,
+    falling back to aggregating the base tables when it does not exist yet.
+    """
+    try:
+        cursor.execute(_DASHBOARD_SQL)
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        cursor.execute(_DASHBOARD_AGGREGATE_SQL)
     
     users = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     
     return render_template('index.html', users=users)
 
@@ -64,187 +407,98 @@ def user_detail(username):
     cursor = conn.cursor()
     
 
-    cursor.execute("""
-        SELECT * FROM account_snapshots 
-        WHERE username = ? 
-        ORDER BY timestamp DESC LIMIT 1
-    """, (username,))
+    cursor.execute(_LATEST_SNAPSHOT_SQL, (username,))
     latest = cursor.fetchone()
     
     if not latest:
         return "User not found", 404
     
 
-    cursor.execute("""
-        SELECT * FROM posts 
-        WHERE username = ? 
-        ORDER BY created_utc DESC
-    """, (username,))
-    posts = [dict(row) for row in cursor.fetchall()]
+    posts, next_before = fetch_posts_page(cursor, username)
+    
+    cursor.execute(_POST_COUNT_SQL, (username,))
+    post_count = cursor.fetchone()['count']
  
-    cursor.execute("SELECT COUNT(*) as count FROM account_snapshots WHERE username = ?", (username,))
+    cursor.execute(_SNAPSHOT_COUNT_SQL, (username,))
     snapshot_count = cursor.fetchone()['count']
     
-    conn.close()
-    
     return render_template('user.html', 
                           user=dict(latest), 
                           posts=posts, 
+                          post_count=post_count,
+                          next_before=next_before,
                           snapshot_count=snapshot_count)
 
 
 @app.route('/api/karma/<username>')
 def api_karma_history(username):
     """API endpoint for karma history (for charts)."""
-    conn = get_db()
-    cursor = conn.cursor()
-    
 
     from_date = request.args.get('from', None)
     to_date = request.args.get('to', None)
     
     if from_date and to_date:
- 
-        cursor.execute("""
-            SELECT timestamp, post_karma, comment_karma, total_karma
-            FROM account_snapshots 
-            WHERE username = ? AND timestamp BETWEEN ? AND ?
-            ORDER BY timestamp ASC
-        """, (username, from_date, to_date))
-    else:
-
-        days = request.args.get('days', 30, type=float)
-  
-        hours = int(days * 24)
-        
-        cursor.execute("""
-            SELECT timestamp, post_karma, comment_karma, total_karma
-            FROM account_snapshots 
-            WHERE username = ? AND timestamp >= datetime('now', ?)
-            ORDER BY timestamp ASC
-        """, (username, f'-{hours} hours'))
-    
-    rows = cursor.fetchall()
-    conn.close()
+        # Bounds arrive as JS ISO strings ("...T...Z"); datetime() normalizes them to
+        # the stored "YYYY-MM-DD HH:MM:SS" form so the text comparison is exact
+        return stream_columns('karma_range', (username, from_date, to_date))
     
-    data = {
-        'labels': [row['timestamp'] for row in rows],
-        'post_karma': [row['post_karma'] for row in rows],
-        'comment_karma': [row['comment_karma'] for row in rows],
-        'total_karma': [row['total_karma'] for row in rows]
-    }
+    days = request.args.get('days', 30, type=float)
+    hours = int(days * 24)
     
-    return jsonify(data)
+    return stream_columns('karma', (username, hours_ago(hours)))
 
 
 @app.route('/api/posts/<username>')
 def api_posts_history(username):
     """API endpoint for posts over time."""
+    return jsonify(query_columns('posts', (username,)))
+
+
+@app.route('/api/user_posts/<username>')
+def api_user_posts(username):
+    """API endpoint for the next page of post cards (for "Load more")."""
     conn = get_db()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT DATE(created_utc) as date, COUNT(*) as count
-        FROM posts 
-        WHERE username = ?
-        GROUP BY DATE(created_utc)
-        ORDER BY date ASC
-    """, (username,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    data = {
-        'labels': [row['date'] for row in rows],
-        'counts': [row['count'] for row in rows]
-    }
+    before = request.args.get('before', None)
+    before_id = request.args.get('before_id', None)
+    # The page key is the pair; half of it would silently restart at page one
+    if bool(before) != bool(before_id):
+        return "before and before_id must be given together", 400
+    posts, next_before = fetch_posts_page(cursor, username,
+                                          (before, before_id) if before else None)
     
-    return jsonify(data)
+    return jsonify({
+        'html': render_template('_post_cards.html', posts=posts),
+        'next_before': next_before
+    })
 
 
 @app.route('/api/subreddits/<username>')
 def api_subreddit_breakdown(username):
     """API endpoint for subreddit breakdown."""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT subreddit, COUNT(*) as count, SUM(score) as total_score
-        FROM posts 
-        WHERE username = ?
-        GROUP BY subreddit
-        ORDER BY count DESC
-        LIMIT 10
-    """, (username,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    data = {
-        'labels': [row['subreddit'] for row in rows],
-        'counts': [row['count'] for row in rows],
-        'scores': [row['total_score'] or 0 for row in rows]
-    }
-    
-    return jsonify(data)
+    return jsonify(query_columns('subreddits', (username,)))
 
 
 @app.route('/api/score_history/<item_type>/<item_id>')
 def api_score_history(item_type, item_id):
     """API endpoint for individual post/comment score history."""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT timestamp, score
-        FROM score_history 
-        WHERE item_type = ? AND item_id = ?
-        ORDER BY timestamp ASC
-    """, (item_type, item_id))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
-    data = {
-        'labels': [row['timestamp'] for row in rows],
-        'scores': [row['score'] for row in rows]
-    }
-    
-    return jsonify(data)
+    return jsonify(query_columns('score_history', (item_type, item_id)))
 
 
 @app.route('/api/activity/<username>')
 def api_activity_heatmap(username):
     """API endpoint for activity heatmap data."""
     conn = get_db()
-    cursor = conn.cursor()
-    
-
-    cursor.execute("""
-        SELECT 
-            CAST(strftime('%w', created_utc) AS INTEGER) as day_of_week,
-            CAST(strftime('%H', created_utc) AS INTEGER) as hour,
-            COUNT(*) as count
-        FROM posts 
-        WHERE username = ?
-        GROUP BY day_of_week, hour
-    """, (username,))
-    
-    post_activity = [dict(row) for row in cursor.fetchall()]
-
-    cursor.execute("""
-        SELECT 
-            CAST(strftime('%w', created_utc) AS INTEGER) as day_of_week,
-            CAST(strftime('%H', created_utc) AS INTEGER) as hour,
-            COUNT(*) as count
-        FROM comments 
-        WHERE username = ?
-        GROUP BY day_of_week, hour
-    """, (username,))
+    cursor = get_tuple_cursor(conn)
     
-    comment_activity = [dict(row) for row in cursor.fetchall()]
+    cursor.execute(_ACTIVITY_SQL, (username, username))
     
-    conn.close()
+    post_activity = []
+    comment_activity = []
+    for kind, day, hour, count in cursor.fetchall():
+        bucket = post_activity if kind == 'post' else comment_activity
+        bucket.append({'day_of_week': day, 'hour': hour, 'count': count})
     
     return jsonify({
         'posts': post_activity,
@@ -255,36 +509,38 @@ def api_activity_heatmap(username):
 @app.route('/api/karma_changes/<username>')
 def api_karma_changes(username):
     """API endpoint for karma changes between snapshots."""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     days = request.args.get('days', 7, type=float)
     hours = int(days * 24)
     
-    cursor.execute("""
-        SELECT timestamp, total_karma,
-               total_karma - LAG(total_karma) OVER (ORDER BY timestamp) as karma_change
-        FROM account_snapshots 
-        WHERE username = ? AND timestamp >= datetime('now', ?)
-        ORDER BY timestamp ASC
-    """, (username, f'-{hours} hours'))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    data = query_columns('karma_changes', (username, hours_ago(hours)))
     
-    data = {
-        'labels': [row['timestamp'] for row in rows],
-        'total_karma': [row['total_karma'] for row in rows],
-        'changes': [row['karma_change'] or 0 for row in rows]
-    }
+    total_karma = data['total_karma']
+    # Diff consecutive snapshots in one pass; rows are already in timestamp order
+    changes = [0] * len(total_karma)
+    for i, (prev, cur) in enumerate(pairwise(total_karma), 1):
+        if prev is not None and cur is not None:
+            changes[i] = cur - prev
+    data['changes'] = changes
     
     return jsonify(data)
 
 
 @app.route('/images/<path:filename>')
 def serve_image(filename):
-    """Serve downloaded images."""
-    return send_from_directory(STATIC_DIR / 'images', filename)
+    """Serve downloaded images, delegating the transfer to nginx when configured."""
+    if X_ACCEL_REDIRECT_PREFIX:
+        internal_path = safe_join(X_ACCEL_REDIRECT_PREFIX, filename)
+        if internal_path is None:
+            return "Not found", 404
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['X-Accel-Redirect'] = internal_path
+    else:
+        response = send_from_directory(STATIC_DIR / 'images', filename, max_age=IMAGE_MAX_AGE)
+    
+    response.cache_control.public = True
+    response.cache_control.max_age = IMAGE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 
 if __name__ == '__main__':
@@ -11,6 +11,121 @@ import sqlite3
 import argparse
 from pathlib import Path
 
+from reddit_monitor import UNIQUE_INDEXES, create_unique_index
+
+
+def count_rows(cursor, table: str) -> int:
+    """Return the number of rows in a table."""
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def max_id(cursor, table: str) -> int:
+    """Return the highest row id in a table (0 if empty)."""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def count_rows_after(cursor, table: str, last_id: int) -> int:
+    """
+    Count rows inserted after last_id. AUTOINCREMENT ids only grow, so this
+    is a rowid range scan over just the new rows.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?", (last_id,))
+    return cursor.fetchone()[0]
+
+
+def merge_tables(target_cur) -> dict:
+    """
+    Copy the attached src database's rows into the target in one transaction.
+    Returns the added/updated/skipped counts per table.
+    """
+    stats = {
+        "account_snapshots": {"added": 0, "skipped": 0},
+        "posts": {"added": 0, "updated": 0, "skipped": 0},
+        "comments": {"added": 0, "updated": 0, "skipped": 0},
+        "score_history": {"added": 0, "skipped": 0},
+    }
+    
+    target_cur.execute("BEGIN")
+    
+    # Upserts below need unique keys; older databases may predate them
+    for index in UNIQUE_INDEXES:
+        create_unique_index(target_cur, *index)
+    
+
+    print("\nMerging account_snapshots...")
+    total = count_rows(target_cur, "src.account_snapshots")
+    target_cur.execute("""
+        INSERT INTO account_snapshots 
+        (username, timestamp, post_karma, comment_karma, total_karma, 
+         account_created, is_gold, is_mod, has_verified_email, raw_data)
+        SELECT username, timestamp, post_karma, comment_karma, total_karma,
+               account_created, is_gold, is_mod, has_verified_email, raw_data
+        FROM src.account_snapshots WHERE true
+        ON CONFLICT(username, timestamp) DO NOTHING
+    """)
+    stats["account_snapshots"]["added"] = target_cur.rowcount
+    stats["account_snapshots"]["skipped"] = total - target_cur.rowcount
+
+    print("Merging posts...")
+    total = count_rows(target_cur, "src.posts")
+    last_id = max_id(target_cur, "posts")
+    target_cur.execute("""
+        INSERT INTO posts 
+        (post_id, username, subreddit, title, selftext, url, local_image_path,
+         score, upvote_ratio, num_comments, created_utc, first_seen, 
+         last_updated, is_self, over_18, permalink)
+        SELECT post_id, username, subreddit, title, selftext, url, local_image_path,
+               score, upvote_ratio, num_comments, created_utc, first_seen,
+               last_updated, is_self, over_18, permalink
+        FROM src.posts WHERE true
+        ON CONFLICT(post_id) DO UPDATE SET 
+            score = excluded.score, upvote_ratio = excluded.upvote_ratio,
+            num_comments = excluded.num_comments, last_updated = excluded.last_updated
+        WHERE excluded.last_updated > posts.last_updated
+    """)
+    changed = target_cur.rowcount
+    stats["posts"]["added"] = count_rows_after(target_cur, "posts", last_id)
+    stats["posts"]["updated"] = changed - stats["posts"]["added"]
+    stats["posts"]["skipped"] = total - changed
+    
+
+    print("Merging comments...")
+    total = count_rows(target_cur, "src.comments")
+    last_id = max_id(target_cur, "comments")
+    target_cur.execute("""
+        INSERT INTO comments 
+        (comment_id, username, subreddit, body, score, created_utc,
+         first_seen, last_updated, parent_id, link_id, permalink)
+        SELECT comment_id, username, subreddit, body, score, created_utc,
+               first_seen, last_updated, parent_id, link_id, permalink
+        FROM src.comments WHERE true
+        ON CONFLICT(comment_id) DO UPDATE SET 
+            score = excluded.score, last_updated = excluded.last_updated
+        WHERE excluded.last_updated > comments.last_updated
+    """)
+    changed = target_cur.rowcount
+    stats["comments"]["added"] = count_rows_after(target_cur, "comments", last_id)
+    stats["comments"]["updated"] = changed - stats["comments"]["added"]
+    stats["comments"]["skipped"] = total - changed
+    
+
+    print("Merging score_history...")
+    total = count_rows(target_cur, "src.score_history")
+    target_cur.execute("""
+        INSERT INTO score_history (item_type, item_id, score, timestamp)
+        SELECT item_type, item_id, score, timestamp
+        FROM src.score_history WHERE true
+        ON CONFLICT(item_type, item_id, timestamp) DO NOTHING
+    """)
+    stats["score_history"]["added"] = target_cur.rowcount
+    stats["score_history"]["skipped"] = total - target_cur.rowcount
+    
+
+    target_cur.execute("COMMIT")
+    return stats
+
 
 def merge_databases(source_path: str, target_path: str, output_path: str = None):
     """
@@ -38,134 +153,38 @@ def merge_databases(source_path: str, target_path: str, output_path: str = None)
         target_path = output_path
         print(f"Created output database: {output_path}")
     
-    # Connect to both databases
-    source_conn = sqlite3.connect(source_path)
-    target_conn = sqlite3.connect(target_path)
-    
-    source_conn.row_factory = sqlite3.Row
-    target_conn.row_factory = sqlite3.Row
-    
-    source_cur = source_conn.cursor()
+    # Attach the source so every phase runs as set-based SQL inside SQLite,
+    # all within a single transaction on the target
+    target_conn = sqlite3.connect(target_path, isolation_level=None)
+    target_conn.execute("ATTACH DATABASE ? AS src", (str(source_path),))
     target_cur = target_conn.cursor()
     
-    stats = {
-        "account_snapshots": {"added": 0, "skipped": 0},
-        "posts": {"added": 0, "updated": 0, "skipped": 0},
-        "comments": {"added": 0, "updated": 0, "skipped": 0},
-        "score_history": {"added": 0, "skipped": 0},
-    }
-    
-
-    print("\nMerging account_snapshots...")
-    source_cur.execute("SELECT * FROM account_snapshots")
-    for row in source_cur.fetchall():
-        target_cur.execute(
-            "SELECT id FROM account_snapshots WHERE username = ? AND timestamp = ?",
-            (row["username"], row["timestamp"])
-        )
-        if not target_cur.fetchone():
-            target_cur.execute("""
-                INSERT INTO account_snapshots 
-                (username, timestamp, post_karma, comment_karma, total_karma, 
-                 account_created, is_gold, is_mod, has_verified_email, raw_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row["username"], row["timestamp"], row["post_karma"], 
-                row["comment_karma"], row["total_karma"], row["account_created"],
-                row["is_gold"], row["is_mod"], row["has_verified_email"], row["raw_data"]
-            ))
-            stats["account_snapshots"]["added"] += 1
-        else:
-            stats["account_snapshots"]["skipped"] += 1
-
-    print("Merging posts...")
-    source_cur.execute("SELECT * FROM posts")
-    for row in source_cur.fetchall():
-        target_cur.execute("SELECT id, last_updated FROM posts WHERE post_id = ?", (row["post_id"],))
-        existing = target_cur.fetchone()
-        
-        if not existing:
-            target_cur.execute("""
-                INSERT INTO posts 
-                (post_id, username, subreddit, title, selftext, url, local_image_path,
-                 score, upvote_ratio, num_comments, created_utc, first_seen, 
-                 last_updated, is_self, over_18, permalink)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row["post_id"], row["username"], row["subreddit"], row["title"],
-                row["selftext"], row["url"], row["local_image_path"], row["score"],
-                row["upvote_ratio"], row["num_comments"], row["created_utc"],
-                row["first_seen"], row["last_updated"], row["is_self"], 
-                row["over_18"], row["permalink"]
-            ))
-            stats["posts"]["added"] += 1
-        elif row["last_updated"] and existing["last_updated"]:
-
-            if row["last_updated"] > existing["last_updated"]:
-                target_cur.execute("""
-                    UPDATE posts SET 
-                        score = ?, upvote_ratio = ?, num_comments = ?, last_updated = ?
-                    WHERE post_id = ?
-                """, (row["score"], row["upvote_ratio"], row["num_comments"], 
-                      row["last_updated"], row["post_id"]))
-                stats["posts"]["updated"] += 1
-            else:
-                stats["posts"]["skipped"] += 1
-        else:
-            stats["posts"]["skipped"] += 1
-    
-
-    print("Merging comments...")
-    source_cur.execute("SELECT * FROM comments")
-    for row in source_cur.fetchall():
-        target_cur.execute("SELECT id, last_updated FROM comments WHERE comment_id = ?", (row["comment_id"],))
-        existing = target_cur.fetchone()
-        
-        if not existing:
-            target_cur.execute("""
-                INSERT INTO comments 
-                (comment_id, username, subreddit, body, score, created_utc,
-                 first_seen, last_updated, parent_id, link_id, permalink)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                row["comment_id"], row["username"], row["subreddit"], row["body"],
-                row["score"], row["created_utc"], row["first_seen"], 
-                row["last_updated"], row["parent_id"], row["link_id"], row["permalink"]
-            ))
-            stats["comments"]["added"] += 1
-        elif row["last_updated"] and existing["last_updated"]:
-            if row["last_updated"] > existing["last_updated"]:
-                target_cur.execute("""
-                    UPDATE comments SET score = ?, last_updated = ?
-                    WHERE comment_id = ?
-                """, (row["score"], row["last_updated"], row["comment_id"]))
-                stats["comments"]["updated"] += 1
-            else:
-                stats["comments"]["skipped"] += 1
-        else:
-            stats["comments"]["skipped"] += 1
-    
-
-    print("Merging score_history...")
-    source_cur.execute("SELECT * FROM score_history")
-    for row in source_cur.fetchall():
-        target_cur.execute(
-            "SELECT id FROM score_history WHERE item_type = ? AND item_id = ? AND timestamp = ?",
-            (row["item_type"], row["item_id"], row["timestamp"])
-        )
-        if not target_cur.fetchone():
-            target_cur.execute("""
-                INSERT INTO score_history (item_type, item_id, score, timestamp)
-                VALUES (?, ?, ?, ?)
-            """, (row["item_type"], row["item_id"], row["score"], row["timestamp"]))
-            stats["score_history"]["added"] += 1
-        else:
-            stats["score_history"]["skipped"] += 1
-    
-
-    target_conn.commit()
-    source_conn.close()
-    target_conn.close()
+    # Bulk-load settings: no fsyncs. A crash mid-merge can corrupt the target,
+    # which is acceptable for this one-shot tool (use --output to merge into a
+    # copy). A WAL target keeps WAL, so the web app can go on reading while
+    # the merge runs; other targets, and --output copies, use an in-memory
+    # rollback journal. The journal mode is restored afterwards since WAL,
+    # unlike the others, persists in the database file.
+    target_cur.execute("PRAGMA main.journal_mode")
+    journal_mode = target_cur.fetchone()[0]
+    bulk_journal = journal_mode != "wal" or output_path is not None
+    target_conn.executescript("""
+        PRAGMA main.synchronous=OFF;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-262144;
+    """)
+    
+    try:
+        if bulk_journal:
+            target_conn.execute("PRAGMA main.journal_mode=MEMORY")
+        stats = merge_tables(target_cur)
+    finally:
+        if target_conn.in_transaction:
+            target_conn.execute("ROLLBACK")
+        if bulk_journal:
+            target_conn.execute(f"PRAGMA main.journal_mode={journal_mode}")
+        target_conn.execute("DETACH DATABASE src")
+        target_conn.close()
     
 
     print("\n" + "=" * 50)
@@ -6,26 +6,90 @@ Stores all data in SQLite database and downloads images locally.
 """
 
 import os
+import re
 import sqlite3
-import requests
-import time
+import zlib
+import asyncio
+import aiohttp
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import json
 import argparse
-import schedule
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent
 DB_PATH = Path(os.environ.get("DATABASE_PATH", BASE_DIR / "reddit_data.db"))
 IMAGES_DIR = BASE_DIR / "static" / "images"
 USER_AGENT = os.environ.get("REDDIT_USER_AGENT", "RedditTracker/1.0 (https://github.com/yourusername/reddit-tracker)")
+# Image downloads allowed in flight at once during a cycle
+MAX_CONCURRENT_DOWNLOADS = 5
+# Reddit API requests allowed per minute (image downloads aren't counted)
+REQUESTS_PER_MINUTE = 60
+# A score moving by less than this fraction (and less than 1 point) is not
+# recorded in score_history until the last sample is SCORE_SAMPLE_HOURS old
+SCORE_CHANGE_RATIO = 0.02
+SCORE_SAMPLE_HOURS = 6
+
+# Image file extension at the end of a URL path, and hosts that only serve images
+IMAGE_EXT_RE = re.compile(r'\.(jpe?g|png|gif|webp)(?:[?#]|$)', re.IGNORECASE)
+IMAGE_HOSTS_RE = re.compile(r'i\.redd\.it|i\.imgur')
+# Saved file extension by content-type / URL extension keyword
+EXT_MAP = {'jpeg': '.jpg', 'jpg': '.jpg', 'png': '.png', 'gif': '.gif', 'webp': '.webp'}
+# Bytes read from the network per write while saving an image
+IMAGE_CHUNK_SIZE = 65536
+# Larger downloads are abandoned (checked against Content-Length and while streaming)
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+# Unique keys the inserts and merge_data.py's upserts rely on: (name, table, columns)
+UNIQUE_INDEXES = (
+    ("idx_snapshots_user_time_unique", "account_snapshots", "username, timestamp"),
+    ("idx_score_history_unique", "score_history", "item_type, item_id, timestamp"),
+)
+
+# ETag of the last saved version of each (username, feed), sent back as
+# If-None-Match on the next cycle
+_feed_etags = {}
+# All SQLite work runs on this one thread: writes stay serialized, a
+# connection is only ever used by the thread that opened it, and the event
+# loop keeps downloading while a batch commits
+_db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+
+async def run_db(func, *args):
+    """Run a blocking database call on the DB thread."""
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, func, *args)
+
+
+def open_db():
+    """
+    Open a connection to the tracker database.
+    WAL lets the web app keep reading while a cycle writes, and with
+    synchronous=NORMAL a commit no longer waits on fsync. journal_mode
+    persists in the file; the rest are per-connection settings.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-64000;
+        PRAGMA mmap_size=268435456;
+        PRAGMA busy_timeout=5000;
+    """)
+    return conn
+
+
+def close_db(conn: sqlite3.Connection):
+    """Close a connection, first letting SQLite refresh planner statistics it found stale."""
+    conn.execute("PRAGMA optimize")
+    conn.close()
 
 
 def init_database():
     """Initialize SQLite database with required tables."""
     IMAGES_DIR.mkdir(parents=True, exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = open_db()
     cursor = conn.cursor()
     
     # Account snapshots - hourly karma/stats captures
@@ -98,120 +162,310 @@ def init_database():
     """)
     
     # Create indexes for faster queries
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_user ON account_snapshots(username)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_time ON account_snapshots(timestamp)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_user ON posts(username)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_user ON comments(username)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_score_history ON score_history(item_type, item_id)")
-    
+
+    # Composite indexes matching the web API's per-user lookups, so they are
+    # served as index range scans in already-sorted order
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snap_user_ts
+        ON account_snapshots(username, timestamp DESC, post_karma, comment_karma, total_karma)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_user_created ON posts(username, created_utc, post_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_user_subreddit ON posts(username, subreddit)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_comments_user_created ON comments(username, created_utc)")
+
+    # Uniqueness the inserts and merges rely on; the score_history one also
+    # serves the per-item score chart in timestamp order
+    for index in UNIQUE_INDEXES:
+        create_unique_index(cursor, *index)
+    # Original single-column indexes made redundant by the composites above
+    for name in ("idx_snapshots_user", "idx_posts_user", "idx_comments_user", "idx_score_history"):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+    create_user_summary(cursor)
+
     conn.commit()
-    conn.close()
+    close_db(conn)
     print(f"[{now()}] Database initialized at {DB_PATH}")
 
 
+def create_user_summary(cursor):
+    """
+    Create the per-user dashboard summary, kept current by insert triggers.
+    Backfilled from existing data the first time it is created.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_summary'")
+    exists = cursor.fetchone() is not None
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_summary (
+            username TEXT PRIMARY KEY,
+            last_updated DATETIME,
+            post_karma INTEGER,
+            comment_karma INTEGER,
+            total_karma INTEGER,
+            post_count INTEGER NOT NULL DEFAULT 0,
+            comment_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    
+    # Latest snapshot wins; merges may insert older snapshots after newer ones
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_snapshots_summary
+        AFTER INSERT ON account_snapshots
+        BEGIN
+            INSERT INTO user_summary (username, last_updated, post_karma, comment_karma, total_karma)
+            VALUES (NEW.username, NEW.timestamp, NEW.post_karma, NEW.comment_karma, NEW.total_karma)
+            ON CONFLICT(username) DO UPDATE SET
+                last_updated = excluded.last_updated,
+                post_karma = excluded.post_karma,
+                comment_karma = excluded.comment_karma,
+                total_karma = excluded.total_karma
+            WHERE user_summary.last_updated IS NULL
+               OR excluded.last_updated >= user_summary.last_updated;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_posts_summary
+        AFTER INSERT ON posts
+        BEGIN
+            INSERT INTO user_summary (username, post_count) VALUES (NEW.username, 1)
+            ON CONFLICT(username) DO UPDATE SET post_count = post_count + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_comments_summary
+        AFTER INSERT ON comments
+        BEGIN
+            INSERT INTO user_summary (username, comment_count) VALUES (NEW.username, 1)
+            ON CONFLICT(username) DO UPDATE SET comment_count = comment_count + 1;
+        END
+    """)
+    
+    if exists:
+        return
+    
+    cursor.execute("""
+        INSERT INTO user_summary 
+        (username, last_updated, post_karma, comment_karma, total_karma, post_count, comment_count)
+        WITH users AS (
+            SELECT username FROM account_snapshots
+            UNION SELECT username FROM posts
+            UNION SELECT username FROM comments
+        ),
+        latest AS (
+            SELECT username, timestamp, post_karma, comment_karma, total_karma,
+                   ROW_NUMBER() OVER (PARTITION BY username ORDER BY timestamp DESC) as rn
+            FROM account_snapshots
+        ),
+        post_counts AS (
+            SELECT username, COUNT(*) as count FROM posts GROUP BY username
+        ),
+        comment_counts AS (
+            SELECT username, COUNT(*) as count FROM comments GROUP BY username
+        )
+        SELECT u.username, l.timestamp, l.post_karma, l.comment_karma, l.total_karma,
+               COALESCE(pc.count, 0), COALESCE(cc.count, 0)
+        FROM users u
+        LEFT JOIN latest l ON l.username = u.username AND l.rn = 1
+        LEFT JOIN post_counts pc ON pc.username = u.username
+        LEFT JOIN comment_counts cc ON cc.username = u.username
+    """)
+
+
+def create_unique_index(cursor, name: str, table: str, columns: str):
+    """Create a unique index, first deleting duplicate rows that would violate it."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,))
+    if cursor.fetchone():
+        return
+    cursor.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {columns})")
+    cursor.execute(f"CREATE UNIQUE INDEX {name} ON {table}({columns})")
+
+
 def now():
     """Return current timestamp string."""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-def download_image(url: str, post_id: str) -> str | None:
+@functools.lru_cache(maxsize=4096)
+def iso_timestamp(ts: float) -> str:
+    """
+    Format a Reddit epoch timestamp the way created_utc is stored.
+    Every cycle sees mostly the same recent items, so results are cached.
+    """
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+async def download_image(session: aiohttp.ClientSession, url: str, post_id: str) -> str | None:
     """Download image from URL and save locally. Returns local path or None."""
     if not url or url in ['self', 'default', 'nsfw', 'spoiler']:
         return None
     
     # Check if it's an image URL
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    is_image = any(ext in url.lower() for ext in image_extensions) or 'i.redd.it' in url or 'i.imgur' in url
-    
-    if not is_image:
+    ext_match = IMAGE_EXT_RE.search(url)
+    if not ext_match and not IMAGE_HOSTS_RE.search(url):
         return None
     
+    filepath = None
     try:
-        headers = {"User-Agent": USER_AGENT}
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        
-        # Determine extension from content-type or URL
-        content_type = resp.headers.get('content-type', '')
-        if 'jpeg' in content_type or 'jpg' in content_type:
-            ext = '.jpg'
-        elif 'png' in content_type:
-            ext = '.png'
-        elif 'gif' in content_type:
-            ext = '.gif'
-        elif 'webp' in content_type:
-            ext = '.webp'
-        else:
-            # Try to get from URL
-            for e in image_extensions:
-                if e in url.lower():
-                    ext = e
-                    break
-            else:
-                ext = '.jpg'
-        
-        filename = f"{post_id}{ext}"
-        filepath = IMAGES_DIR / filename
-        
-        with open(filepath, 'wb') as f:
-            f.write(resp.content)
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            resp.raise_for_status()
+            content_type = resp.headers.get('content-type', '')
+            
+            # The URL check is only a guess; the headers decide before any body is read
+            if not content_type.startswith('image/'):
+                raise ValueError(f"not an image ({content_type or 'no content-type'})")
+            if resp.content_length and resp.content_length > MAX_IMAGE_BYTES:
+                raise ValueError(f"too large ({resp.content_length:,} bytes)")
+            
+            # Determine extension from content-type or URL
+            ext = next((e for key, e in EXT_MAP.items() if key in content_type), None)
+            if ext is None:
+                ext = EXT_MAP[ext_match.group(1).lower()] if ext_match else '.jpg'
+            
+            filename = f"{post_id}{ext}"
+            filepath = IMAGES_DIR / filename
+            
+            # Stream the body to disk so memory stays bounded however large the
+            # image is; writes run in a worker thread to keep the loop free
+            f = await asyncio.to_thread(open, filepath, 'wb')
+            try:
+                size = 0
+                async for chunk in resp.content.iter_chunked(IMAGE_CHUNK_SIZE):
+                    # Content-Length may be missing or wrong, so count as well
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        raise ValueError(f"too large (over {MAX_IMAGE_BYTES:,} bytes)")
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                f.close()
         
         return f"images/{filename}"  # Relative path for web serving
         
     except Exception as e:
         print(f"  Could not download image: {e}")
+        if filepath:
+            filepath.unlink(missing_ok=True)
         return None
 
 
-def fetch_user_about(username: str) -> dict | None:
+async def download_images(session: aiohttp.ClientSession, posts: list) -> dict:
+    """Download images for the given posts concurrently. Returns {post_id: local path}."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    
+    async def download(post):
+        async with semaphore:
+            return await download_image(session, post.get("url", ""), post.get("id"))
+    
+    paths = await asyncio.gather(*(download(post) for post in posts))
+    return {post.get("id"): path for post, path in zip(posts, paths) if path}
+
+
+class RateLimiter:
+    """Space out requests evenly so they never exceed a per-minute budget."""
+    
+    def __init__(self, requests_per_minute: int):
+        self._interval = 60 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def wait(self):
+        """Wait until the next request may start."""
+        async with self._lock:
+            current = asyncio.get_running_loop().time()
+            if self._next_slot > current:
+                await asyncio.sleep(self._next_slot - current)
+            self._next_slot = max(current, self._next_slot) + self._interval
+
+
+async def fetch_json(session: aiohttp.ClientSession, limiter: RateLimiter, url: str,
+                     params: dict | None = None, etag: str | None = None) -> tuple:
+    """
+    GET a Reddit API URL and decode the JSON body. Returns (data, etag).
+    Given an etag the request revalidates against it, and (None, None) is
+    returned when Reddit answers 304 Not Modified.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    
+    await limiter.wait()
+    async with session.get(url, params=params, headers=headers) as resp:
+        if resp.status == 304:
+            return None, None
+        resp.raise_for_status()
+        return await resp.json(), resp.headers.get("ETag")
+
+
+async def fetch_user_about(session: aiohttp.ClientSession, limiter: RateLimiter, username: str) -> dict | None:
     """Fetch user profile data from Reddit API."""
     url = f"https://www.reddit.com/user/{username}/about.json"
-    headers = {"User-Agent": USER_AGENT}
     
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-        return resp.json().get("data", {})
-    except requests.RequestException as e:
+        data, _ = await fetch_json(session, limiter, url)
+        return data.get("data", {})
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"[{now()}] Error fetching user about: {e}")
         return None
 
 
-def fetch_user_posts(username: str, limit: int = 100) -> list:
-    """Fetch user's recent posts."""
+async def fetch_user_posts(session: aiohttp.ClientSession, limiter: RateLimiter, username: str,
+                         limit: int = 100) -> tuple:
+    """
+    Fetch user's recent posts. Returns (posts, etag); posts is None if
+    unchanged since the last saved fetch.
+    """
     url = f"https://www.reddit.com/user/{username}/submitted.json"
-    headers = {"User-Agent": USER_AGENT}
     params = {"limit": limit, "sort": "new"}
     
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        return [child["data"] for child in data.get("data", {}).get("children", [])]
-    except requests.RequestException as e:
+        data, etag = await fetch_json(session, limiter, url, params, _feed_etags.get((username, "posts")))
+        if data is None:
+            return None, None
+        return [child["data"] for child in data.get("data", {}).get("children", [])], etag
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"[{now()}] Error fetching posts: {e}")
-        return []
+        return [], None
 
 
-def fetch_user_comments(username: str, limit: int = 100) -> list:
-    """Fetch user's recent comments."""
+async def fetch_user_comments(session: aiohttp.ClientSession, limiter: RateLimiter, username: str,
+                            limit: int = 100) -> tuple:
+    """
+    Fetch user's recent comments. Returns (comments, etag); comments is None if
+    unchanged since the last saved fetch.
+    """
     url = f"https://www.reddit.com/user/{username}/comments.json"
-    headers = {"User-Agent": USER_AGENT}
     params = {"limit": limit, "sort": "new"}
     
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        return [child["data"] for child in data.get("data", {}).get("children", [])]
-    except requests.RequestException as e:
+        data, etag = await fetch_json(session, limiter, url, params, _feed_etags.get((username, "comments")))
+        if data is None:
+            return None, None
+        return [child["data"] for child in data.get("data", {}).get("children", [])], etag
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
         print(f"[{now()}] Error fetching comments: {e}")
-        return []
+        return [], None
 
 
-def save_account_snapshot(username: str, data: dict):
-    """Save account karma snapshot to database."""
-    conn = sqlite3.connect(DB_PATH)
+def compress_raw_data(data: dict) -> bytes:
+    """Serialize an about payload for raw_data as zlib-compressed compact JSON."""
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6)
+
+
+def load_raw_data(value: bytes | str | None) -> dict | None:
+    """Decode raw_data, which is plain JSON text in rows written before compression."""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = zlib.decompress(value)
+    return json.loads(value)
+
+
+def save_account_snapshot(conn: sqlite3.Connection, username: str, data: dict):
+    """
+    Save account karma snapshot to database. A second snapshot for the user
+    within the same second (CURRENT_TIMESTAMP's resolution) is skipped.
+    """
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -219,212 +473,316 @@ def save_account_snapshot(username: str, data: dict):
         (username, post_karma, comment_karma, total_karma, account_created, 
          is_gold, is_mod, has_verified_email, raw_data)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(username, timestamp) DO NOTHING
     """, (
         username,
         data.get("link_karma", 0),
         data.get("comment_karma", 0),
         data.get("total_karma", 0),
-        datetime.fromtimestamp(data.get("created_utc", 0)).isoformat() if data.get("created_utc") else None,
+        iso_timestamp(data["created_utc"]) if data.get("created_utc") else None,
         data.get("is_gold", False),
         data.get("is_mod", False),
         data.get("has_verified_email", False),
-        json.dumps(data)
+        compress_raw_data(data)
     ))
+
+
+def find_new_posts(conn: sqlite3.Connection, posts: list) -> list:
+    """Return the posts not yet stored in the database, with one IN (...) lookup."""
+    ids = [post.get("id") for post in posts]
+    placeholders = ",".join("?" * len(ids))
     
-    conn.commit()
-    conn.close()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT post_id FROM posts WHERE post_id IN ({placeholders})", ids)
+    existing = {row[0] for row in cursor.fetchall()}
+    
+    return [post for post in posts if post.get("id") not in existing]
 
 
-def save_posts(username: str, posts: list):
-    """Save or update posts in database, downloading images."""
-    conn = sqlite3.connect(DB_PATH)
+def last_score_samples(cursor: sqlite3.Cursor, item_type: str, item_ids: list) -> dict:
+    """Return {item_id: (score, timestamp)} for the latest score_history row of each item."""
+    placeholders = ",".join("?" * len(item_ids))
+    
+    # With MAX(), SQLite takes the bare score column from the row holding the max timestamp
+    cursor.execute(f"""
+        SELECT item_id, score, MAX(timestamp)
+        FROM score_history
+        WHERE item_type = ? AND item_id IN ({placeholders})
+        GROUP BY item_id
+    """, (item_type, *item_ids))
+    return {item_id: (score, timestamp) for item_id, score, timestamp in cursor.fetchall()}
+
+
+def sample_cutoff() -> str:
+    """Timestamp before which a score sample is old enough to be superseded by any change."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=SCORE_SAMPLE_HOURS)
+    return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def should_record_score(score: int, sample: tuple | None, cutoff: str) -> bool:
+    """
+    Decide whether a score gets a new score_history row. Charts draw the
+    series as steps, so small moves wait until the last sample is stale.
+    """
+    if sample is None or sample[0] is None:
+        return True
+    last_score, last_time = sample
+    if score == last_score:
+        return False
+    return abs(score - last_score) >= max(1, abs(last_score) * SCORE_CHANGE_RATIO) or last_time < cutoff
+
+
+def save_posts(conn: sqlite3.Connection, username: str, posts: list, image_paths: dict) -> list:
+    """
+    Save or update posts in database, with the local paths of downloaded images.
+    Returns the score_history rows to record.
+    """
     cursor = conn.cursor()
     
+    samples = last_score_samples(cursor, 'post', [post.get("id") for post in posts])
+    cutoff = sample_cutoff()
+    
+    rows = []
+    history = []
     for post in posts:
         post_id = post.get("id")
-        created = datetime.fromtimestamp(post.get("created_utc", 0)).isoformat()
+        score = post.get("score", 0)
+        created = iso_timestamp(post.get("created_utc", 0))
+        image_url = post.get("url", "")
         
-        # Check if post exists
-        cursor.execute("SELECT id, score, local_image_path FROM posts WHERE post_id = ?", (post_id,))
-        existing = cursor.fetchone()
+        # Only new posts have a downloaded image; the upsert never overwrites
+        # local_image_path of a known post
+        local_image_path = image_paths.get(post_id)
+        if local_image_path:
+            print(f"    Downloaded image for: {post.get('title', '')[:40]}...")
         
-        if existing:
-            # Update existing post
-            old_score = existing[1]
-            new_score = post.get("score", 0)
-            
-            cursor.execute("""
-                UPDATE posts SET 
-                    score = ?, upvote_ratio = ?, num_comments = ?, last_updated = CURRENT_TIMESTAMP
-                WHERE post_id = ?
-            """, (new_score, post.get("upvote_ratio"), post.get("num_comments"), post_id))
-            
-            # Log score change if different
-            if old_score != new_score:
-                cursor.execute("""
-                    INSERT INTO score_history (item_type, item_id, score)
-                    VALUES ('post', ?, ?)
-                """, (post_id, new_score))
-        else:
-            # New post - download image
-            image_url = post.get("url", "")
-            local_image_path = download_image(image_url, post_id)
-            
-            cursor.execute("""
-                INSERT INTO posts 
-                (post_id, username, subreddit, title, selftext, url, local_image_path, score, upvote_ratio,
-                 num_comments, created_utc, is_self, over_18, permalink)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                post_id, username, post.get("subreddit"),
-                post.get("title"), post.get("selftext"), image_url, local_image_path,
-                post.get("score"), post.get("upvote_ratio"), post.get("num_comments"),
-                created, post.get("is_self"), post.get("over_18"),
-                post.get("permalink")
-            ))
-            
-            # Initial score entry
-            cursor.execute("""
-                INSERT INTO score_history (item_type, item_id, score)
-                VALUES ('post', ?, ?)
-            """, (post_id, post.get("score", 0)))
-            
-            if local_image_path:
-                print(f"    Downloaded image for: {post.get('title', '')[:40]}...")
-    
-    conn.commit()
-    conn.close()
+        # Record the initial score and any significant change
+        if should_record_score(score, samples.get(post_id), cutoff):
+            history.append(('post', post_id, score))
+        
+        rows.append((
+            post_id, username, post.get("subreddit"),
+            post.get("title"), post.get("selftext"), image_url, local_image_path,
+            score, post.get("upvote_ratio"), post.get("num_comments"),
+            created, post.get("is_self"), post.get("over_18"),
+            post.get("permalink")
+        ))
+    
+    # New posts are inserted, known ones only get their live counters refreshed
+    cursor.executemany("""
+        INSERT INTO posts 
+        (post_id, username, subreddit, title, selftext, url, local_image_path, score, upvote_ratio,
+         num_comments, created_utc, is_self, over_18, permalink)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(post_id) DO UPDATE SET
+            score = excluded.score,
+            upvote_ratio = excluded.upvote_ratio,
+            num_comments = excluded.num_comments,
+            last_updated = CURRENT_TIMESTAMP
+    """, rows)
+    
+    return history
 
 
-def save_comments(username: str, comments: list):
-    """Save or update comments in database."""
-    conn = sqlite3.connect(DB_PATH)
+def save_comments(conn: sqlite3.Connection, username: str, comments: list) -> list:
+    """Save or update comments in database. Returns the score_history rows to record."""
     cursor = conn.cursor()
     
+    samples = last_score_samples(cursor, 'comment', [comment.get("id") for comment in comments])
+    cutoff = sample_cutoff()
+    
+    rows = []
+    history = []
     for comment in comments:
         comment_id = comment.get("id")
-        created = datetime.fromtimestamp(comment.get("created_utc", 0)).isoformat()
+        score = comment.get("score", 0)
+        created = iso_timestamp(comment.get("created_utc", 0))
         
-        # Check if comment exists
-        cursor.execute("SELECT id, score FROM comments WHERE comment_id = ?", (comment_id,))
-        existing = cursor.fetchone()
+        # Record the initial score and any significant change
+        if should_record_score(score, samples.get(comment_id), cutoff):
+            history.append(('comment', comment_id, score))
         
-        if existing:
-            old_score = existing[1]
-            new_score = comment.get("score", 0)
-            
-            cursor.execute("""
-                UPDATE comments SET score = ?, last_updated = CURRENT_TIMESTAMP
-                WHERE comment_id = ?
-            """, (new_score, comment_id))
-            
-            if old_score != new_score:
-                cursor.execute("""
-                    INSERT INTO score_history (item_type, item_id, score)
-                    VALUES ('comment', ?, ?)
-                """, (comment_id, new_score))
-        else:
-            cursor.execute("""
-                INSERT INTO comments 
-                (comment_id, username, subreddit, body, score, created_utc, 
-                 parent_id, link_id, permalink)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                comment_id, username, comment.get("subreddit"),
-                comment.get("body"), comment.get("score"), created,
-                comment.get("parent_id"), comment.get("link_id"),
-                comment.get("permalink")
-            ))
-            
-            cursor.execute("""
-                INSERT INTO score_history (item_type, item_id, score)
-                VALUES ('comment', ?, ?)
-            """, (comment_id, comment.get("score", 0)))
+        rows.append((
+            comment_id, username, comment.get("subreddit"),
+            comment.get("body"), score, created,
+            comment.get("parent_id"), comment.get("link_id"),
+            comment.get("permalink")
+        ))
+    
+    cursor.executemany("""
+        INSERT INTO comments 
+        (comment_id, username, subreddit, body, score, created_utc, 
+         parent_id, link_id, permalink)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(comment_id) DO UPDATE SET
+            score = excluded.score,
+            last_updated = CURRENT_TIMESTAMP
+    """, rows)
     
-    conn.commit()
-    conn.close()
+    return history
+
+
+def save_score_history(conn: sqlite3.Connection, history: list):
+    """Record a cycle's (item_type, item_id, score) samples in one batch."""
+    conn.executemany("""
+        INSERT OR IGNORE INTO score_history (item_type, item_id, score)
+        VALUES (?, ?, ?)
+    """, history)
+
+
+def save_cycle(conn: sqlite3.Connection, username: str, about: dict,
+               posts: list | None, comments: list | None, image_paths: dict):
+    """Save everything a cycle fetched in one transaction, so it costs a single commit."""
+    with conn:
+        save_account_snapshot(conn, username, about)
+        history = []
+        if posts:
+            history += save_posts(conn, username, posts, image_paths)
+        if comments:
+            history += save_comments(conn, username, comments)
+        save_score_history(conn, history)
+
 
+async def open_session() -> aiohttp.ClientSession:
+    """
+    Open the HTTP session for a monitoring run. It is kept across cycles so
+    the connections (and TLS sessions) to Reddit's hosts are reused.
+    """
+    return aiohttp.ClientSession(
+        headers={"User-Agent": USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=10),
+    )
 
-def monitor_user(username: str):
+
+async def fetch_into(queue: asyncio.Queue, kind: str, fetch):
+    """
+    Await a fetch coroutine and queue its result under kind. An unexpected
+    exception is queued in place of the result, so the consumer never waits
+    on a fetcher that has died.
+    """
+    try:
+        result = await fetch
+    except Exception as e:
+        result = e
+    await queue.put((kind, result))
+
+
+async def download_new_images(session: aiohttp.ClientSession, conn: sqlite3.Connection, posts: list) -> dict:
+    """Download the images of the posts not yet in the database."""
+    new_posts = await run_db(find_new_posts, conn, posts)
+    return await download_images(session, new_posts)
+
+
+async def monitor_user(session: aiohttp.ClientSession, limiter: RateLimiter, username: str):
     """Run a single monitoring cycle for a user."""
     print(f"\n[{now()}] Monitoring u/{username}...")
     
-    # Fetch and save account data
-    about = fetch_user_about(username)
-    if about:
-        save_account_snapshot(username, about)
-        print(f"  Post karma: {about.get('link_karma', 0):,}")
-        print(f"  Comment karma: {about.get('comment_karma', 0):,}")
-        print(f"  Total karma: {about.get('total_karma', 0):,}")
-    else:
-        print(f"  Failed to fetch account data")
-        return
-    
-    time.sleep(1)  # Rate limiting
-    
-    # Fetch and save posts
-    posts = fetch_user_posts(username)
+    # Fetchers queue account data, posts and comments as each arrives, under
+    # the shared rate limit; the loop below consumes them in arrival order
+    queue = asyncio.Queue()
+    fetchers = [
+        asyncio.create_task(fetch_into(queue, "about", fetch_user_about(session, limiter, username))),
+        asyncio.create_task(fetch_into(queue, "posts", fetch_user_posts(session, limiter, username))),
+        asyncio.create_task(fetch_into(queue, "comments", fetch_user_comments(session, limiter, username))),
+    ]
+    
+    conn = await run_db(open_db)
+    downloads = None
+    try:
+        results, etags = {}, {}
+        for _ in fetchers:
+            kind, data = await queue.get()
+            if isinstance(data, Exception):
+                print(f"  Failed to fetch {kind}: {data!r}")
+                return
+            if kind != "about":
+                data, etags[kind] = data
+            results[kind] = data
+            # Images of new posts start downloading while the other feeds are
+            # still in flight, and before the write transaction starts
+            if kind == "posts" and data:
+                downloads = asyncio.create_task(download_new_images(session, conn, data))
+        about, posts, comments = results["about"], results["posts"], results["comments"]
+        
+        if not about:
+            print(f"  Failed to fetch account data")
+            return
+        
+        image_paths = await downloads if downloads else {}
+        await run_db(save_cycle, conn, username, about, posts, comments, image_paths)
+        
+        # Revalidate against these feed versions only once they are saved
+        for kind, etag in etags.items():
+            if etag:
+                _feed_etags[(username, kind)] = etag
+    finally:
+        for task in fetchers:
+            task.cancel()
+        if downloads and not downloads.done():
+            downloads.cancel()
+            await asyncio.gather(downloads, return_exceptions=True)
+        await run_db(close_db, conn)
+    
+    print(f"  Post karma: {about.get('link_karma', 0):,}")
+    print(f"  Comment karma: {about.get('comment_karma', 0):,}")
+    print(f"  Total karma: {about.get('total_karma', 0):,}")
     if posts:
-        save_posts(username, posts)
         print(f"  Tracked {len(posts)} posts")
-    
-    time.sleep(1)
-    
-    # Fetch and save comments
-    comments = fetch_user_comments(username)
+    elif posts is None:
+        print("  Posts unchanged since last check")
     if comments:
-        save_comments(username, comments)
         print(f"  Tracked {len(comments)} comments")
+    elif comments is None:
+        print("  Comments unchanged since last check")
     
     print(f"[{now()}] Monitoring cycle complete")
 
 
+async def monitor_once(username: str):
+    """Run one monitoring cycle with its own HTTP session."""
+    session = await open_session()
+    try:
+        await monitor_user(session, RateLimiter(REQUESTS_PER_MINUTE), username)
+    finally:
+        await session.close()
+
+
 def get_stats(username: str):
     """Display current statistics for a user."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = open_db()
     cursor = conn.cursor()
     
-    # Latest snapshot
-    cursor.execute("""
-        SELECT timestamp, post_karma, comment_karma, total_karma
-        FROM account_snapshots WHERE username = ?
-        ORDER BY timestamp DESC LIMIT 1
-    """, (username,))
-    snapshot = cursor.fetchone()
-    
-    # Karma change over last 24h
+    # Latest snapshot, karma 24h ago and tracked counts in one statement
     cursor.execute("""
-        SELECT total_karma FROM account_snapshots 
-        WHERE username = ? AND timestamp >= datetime('now', '-24 hours')
-        ORDER BY timestamp ASC LIMIT 1
-    """, (username,))
-    old_karma = cursor.fetchone()
-    
-    # Post/comment counts
-    cursor.execute("SELECT COUNT(*) FROM posts WHERE username = ?", (username,))
-    post_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM comments WHERE username = ?", (username,))
-    comment_count = cursor.fetchone()[0]
-    
-    # Snapshot count
-    cursor.execute("SELECT COUNT(*) FROM account_snapshots WHERE username = ?", (username,))
-    snapshot_count = cursor.fetchone()[0]
-    
-    # Images downloaded
-    cursor.execute("SELECT COUNT(*) FROM posts WHERE username = ? AND local_image_path IS NOT NULL", (username,))
-    image_count = cursor.fetchone()[0]
-    
-    conn.close()
+        SELECT
+            latest.timestamp, latest.post_karma, latest.comment_karma, latest.total_karma,
+            (SELECT total_karma FROM account_snapshots 
+             WHERE username = :username AND timestamp >= datetime('now', '-24 hours')
+             ORDER BY timestamp ASC LIMIT 1),
+            (SELECT COUNT(*) FROM posts WHERE username = :username),
+            (SELECT COUNT(*) FROM comments WHERE username = :username),
+            (SELECT COUNT(*) FROM account_snapshots WHERE username = :username),
+            (SELECT COUNT(*) FROM posts WHERE username = :username AND local_image_path IS NOT NULL)
+        FROM (SELECT 1)
+        LEFT JOIN (
+            SELECT timestamp, post_karma, comment_karma, total_karma
+            FROM account_snapshots WHERE username = :username
+            ORDER BY timestamp DESC LIMIT 1
+        ) latest
+    """, {"username": username})
+    (last_checked, post_karma, comment_karma, total_karma, old_karma,
+     post_count, comment_count, snapshot_count, image_count) = cursor.fetchone()
+    
+    close_db(conn)
     
     print(f"\n=== Stats for u/{username} ===")
-    if snapshot:
-        print(f"Last checked: {snapshot[0]}")
-        print(f"Post karma: {snapshot[1]:,}")
-        print(f"Comment karma: {snapshot[2]:,}")
-        print(f"Total karma: {snapshot[3]:,}")
-        if old_karma:
-            change = snapshot[3] - old_karma[0]
+    if last_checked:
+        print(f"Last checked: {last_checked}")
+        print(f"Post karma: {post_karma:,}")
+        print(f"Comment karma: {comment_karma:,}")
+        print(f"Total karma: {total_karma:,}")
+        if old_karma is not None:
+            change = total_karma - old_karma
             print(f"24h karma change: {change:+,}")
     print(f"Posts tracked: {post_count}")
     print(f"Comments tracked: {comment_count}")
@@ -432,22 +790,26 @@ def get_stats(username: str):
     print(f"Total snapshots: {snapshot_count}")
 
 
+async def monitor_forever(username: str, interval_minutes: int):
+    """Monitor a user every interval_minutes on one event loop and HTTP session."""
+    session = await open_session()
+    limiter = RateLimiter(REQUESTS_PER_MINUTE)
+    try:
+        while True:
+            await monitor_user(session, limiter, username)
+            await asyncio.sleep(interval_minutes * 60)
+    finally:
+        await session.close()
+
+
 def run_scheduler(username: str, interval_minutes: int = 30):
     """Run the scheduler for periodic monitoring."""
     print(f"[{now()}] Starting Reddit Tracker for u/{username}")
     print(f"[{now()}] Checking every {interval_minutes} minutes")
     print(f"[{now()}] Press Ctrl+C to stop\n")
     
-    # Run immediately on start
-    monitor_user(username)
-    
-    # Schedule periodic runs
-    schedule.every(interval_minutes).minutes.do(monitor_user, username=username)
-    
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+        asyncio.run(monitor_forever(username, interval_minutes))
     except KeyboardInterrupt:
         print(f"\n[{now()}] Monitoring stopped")
 
@@ -480,7 +842,7 @@ def main():
     if args.stats:
         get_stats(args.username)
     elif args.once:
-        monitor_user(args.username)
+        asyncio.run(monitor_once(args.username))
     else:
         run_scheduler(args.username, args.interval)
 